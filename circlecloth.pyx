@@ -15,7 +15,8 @@ class CircleCloth(Cloth):
                  centerx=300, centery=300, radius=150, gravity=-1000.0,
                  elasticity=1.0, pin_cond="default", bounds=(600, 600, 800),
                  minimum_z=None, time_interval=0.016, thickness=3,
-                 offset=50):
+                 offset=50, physics_accuracy=1, min_physics_accuracy=1,
+                 min_improvement=0.05, tolerance=None, rms_tolerance=None):
         """A cloth on which a circle can be drawn.
         It can also be grabbed and tensioned at specific coordinates.
         
@@ -66,6 +67,10 @@ class CircleCloth(Cloth):
         Main difference with this and superclass is that we track circle points
         specifically, so we can visualize them later (and also to determine if a
         cutting point is close to the circle).
+
+        `physics_accuracy` defaults to a single constraint sweep per time step,
+        as before. Raising it lets the number of sweeps adapt to the residual
+        stretch, see `Cloth.set_solver_params`.
         """
         self.pts = []
         self.shapepts = []
@@ -78,6 +83,8 @@ class CircleCloth(Cloth):
         self.time_interval = time_interval
         self.min_z = minimum_z
         self.thickness = thickness
+        self.set_solver_params(physics_accuracy, min_physics_accuracy,
+                               min_improvement, tolerance, rms_tolerance)
 
         # Should we multiply sqrt(2) to thresh dist? 100 is normal thresh dist.
         diag_dist = 100 * np.sqrt(2)
@@ -188,14 +195,13 @@ class CircleCloth(Cloth):
 
         We _should_ be doing the same thing that they are doing, assuming that
         physics_accuracy is set at 1 and that we do cloth-cloth collisions. Not
-        sure why we had physics_accuracy set at 5?
+        sure why we had physics_accuracy set at 5? With a larger
+        `physics_accuracy`, `relax` picks the number of sweeps per step from
+        the residual stretch.
         """
-        physics_accuracy = 1
         time_interval = self.time_interval
 
-        for i in range(physics_accuracy):
-            for pt in self.pts:
-                pt.resolve_constraints()
+        self.relax()
         for pt in self.pts:
             pt.update(time_interval)
  
@@ -327,6 +333,7 @@ class CircleCloth(Cloth):
         the init code ...)
         """
         self.mouse.reset()
+        self.clear_residuals()
         width, height = self.initial_params[0]
         dx, dy = self.initial_params[1]
         centerx, centery, radius = self.initial_params[2]
@@ -64,11 +64,12 @@ class Point(object):
             self.vx, self.vy, self.vz = self.vx + x, self.vy + y, self.vz + z
 
 
-    def resolve_constraints(self):
-        """Resolve constraints wrt this point.
+    def resolve_constraints(self, residual=None):
+        """Resolve constraints wrt this point, adding their stretch to
+        `residual` if one is given (see `Constraint.resolve`).
         """
         for constraint in self.constraints:
-            constraint.resolve()
+            constraint.resolve(residual)
         
 
     def update(self, delta):
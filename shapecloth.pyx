@@ -1,6 +1,7 @@
 from point import *
 from cloth import *
 from mouse import *
+from shapemask import *
 from collections import deque
 from scipy import signal
 from scipy import stats
@@ -14,33 +15,48 @@ A subclass of cloth, on which a shape pattern is drawn. It also can be grabbed a
 """
 class ShapeCloth(Cloth):
 
-    def __init__(self, shape_fn, mouse=None, width=50, height=50, dx=10, dy=10,gravity=-2500.0, elasticity=1.0, pin_cond="default", bounds=(600, 600, 800), blobs=None, corners=None, noise=0):
+    def __init__(self, shape_fn, mouse=None, width=50, height=50, dx=10, dy=10,gravity=-2500.0, elasticity=1.0, pin_cond="default", bounds=(600, 600, 800), blobs=None, corners=None, noise=0, mask=None, physics_accuracy=5, min_physics_accuracy=5, min_improvement=0.05, tolerance=None, rms_tolerance=None):
         """
-        A cloth on which a shape can be drawn. It can also be grabbed and tensioned at specific coordinates. It takes in a function shape_fn that takes in 2 arguments, x and y, that specify whether or not a point is located on the outline of a shape.
+        A cloth on which a shape can be drawn. It can also be grabbed and tensioned at specific coordinates. It takes in a function shape_fn that takes in 2 arguments, x and y, that specify whether or not a point is located on the outline of a shape. shape_fn may also be an array of polygon vertices. The shape and blobs are rasterized once into a ShapeMask; a precomputed MASK can be passed in to skip that step. See Cloth.set_solver_params for the constraint solver arguments.
         """
         if not mouse:
             mouse = Mouse(bounds=bounds)
-        self.pts = []
-        self.shapepts = []
-        self.normalpts = []
         self.tensioners = []
         self.bounds = bounds
         self.mouse = mouse
-        self.allpts = {}
-        self.blobs = []
-        self.blobpts = []
         self.noise = noise
-        if self.blobs != None and corners != None:
-            self.blob_fn = get_blob_fn(corners, blobs)
-            for blob in blobs:
-                self.blobs.append([])
-        else:
-            self.blob_fn = lambda x, y: False
+        self.set_solver_params(physics_accuracy, min_physics_accuracy, min_improvement, tolerance, rms_tolerance)
+        if mask is None:
+            blob_fn, numblobs = None, 0
+            if blobs is not None and corners is not None:
+                blob_fn, numblobs = get_blob_fn(corners, blobs), len(blobs)
+            mask = ShapeMask(shape_fn, width, height, dx, dy, blob_fn, numblobs)
+        assert mask.shape.shape == (height, width), "mask is {}, cloth is {}".format(mask.shape.shape, (height, width))
+        self.mask = mask
         if pin_cond == "default":
             pin_cond = lambda x, y, height, width: y == height - 1 or y == 0
+        self.initial_params = [(width, height), (dx, dy), shape_fn, gravity, elasticity, pin_cond]
+        self.build_points()
+        self.setup()
+
+    def build_points(self):
+        """
+        Creates the grid of points and sorts them into shape, blob and normal points using the mask.
+        """
+        width, height = self.initial_params[0]
+        dx, dy = self.initial_params[1]
+        gravity = self.initial_params[3]
+        elasticity = self.initial_params[4]
+        pin_cond = self.initial_params[5]
+        self.pts = []
+        self.shapepts = []
+        self.normalpts = []
+        self.allpts = {}
+        self.blobpts = []
+        self.blobs = [[] for _ in range(self.mask.numblobs)]
         for i in range(height):
             for j in range(width):
-                pt = Point(mouse, 50 + dx * j, 50 + dy * i, gravity=gravity, elasticity=elasticity, bounds=bounds, identity=j + i * width, noise=noise)
+                pt = Point(self.mouse, 50 + dx * j, 50 + dy * i, gravity=gravity, elasticity=elasticity, bounds=self.bounds, identity=j + i * width, noise=self.noise)
                 self.allpts[i * height + j] = pt
                 if i > 0:
                     pt.add_constraint(self.pts[width * (i - 1) + j])
@@ -48,23 +64,18 @@ class ShapeCloth(Cloth):
                     pt.add_constraint(self.pts[-1])
                 if pin_cond(j, i, height, width):
                     pt.pinned = True
-                if shape_fn(pt.x, pt.y):
-                    self.shapepts.append(pt)
+                if self.mask.shape[i, j]:
                     pt.shape = 1
+                b = self.mask.blobs[i, j]
+                if b >= 0:
+                    self.blobs[b].append(pt)
+                    self.blobpts.append(pt)
+                elif pt.shape:
+                    self.shapepts.append(pt)
                 else:
                     self.normalpts.append(pt)
                 self.pts.append(pt)
-                b = self.blob_fn(pt.x, pt.y)
-                if b != -1 and b != False:
-                    self.blobs[b].append(pt)
-                    if pt in self.shapepts:
-                        self.shapepts.remove(pt)
-                    if pt in self.normalpts:
-                        self.normalpts.remove(pt)
-                    self.blobpts.append(pt)
         self.pts, self.normalpts, self.shapepts = set(self.pts), set(self.normalpts), set(self.shapepts)
-        self.initial_params = [(width, height), (dx, dy), shape_fn, gravity, elasticity, pin_cond]
-        self.setup()
 
     def displacement_to_line(self, x, y):
         bestdist = float('inf')
@@ -90,10 +101,7 @@ class ShapeCloth(Cloth):
         """
         Update function updates the state of the cloth after a time step.
         """
-        physics_accuracy = 5
-        for i in range(physics_accuracy):
-            for pt in self.pts:
-                pt.resolve_constraints()
+        self.relax()
         for pt in self.pts:
             pt.update(0.016)
         toremoveshape, toremovenorm, toremoveblob = [], [], []
@@ -127,47 +135,9 @@ class ShapeCloth(Cloth):
         Resets cloth to its initial state.
         """
         self.mouse.reset()
-        width, height = self.initial_params[0]
-        dx, dy = self.initial_params[1]
-        shape_fn = self.initial_params[2]
-        gravity = self.initial_params[3]
-        elasticity = self.initial_params[4]
-        pin_cond = self.initial_params[5]
-        self.pts = []
-        self.shapepts = []
-        self.normalpts = []
+        self.clear_residuals()
         self.tensioners = []
-        self.allpts = {}
-        self.blobpts = []
-        numblobs = len(self.blobs)
-        self.blobs = []
-        for i in range(numblobs):
-            self.blobs.append([])
-        for i in range(height):
-            for j in range(width):
-                pt = Point(self.mouse, 50 + dx * j, 50 + dy * i, gravity=gravity, elasticity=elasticity, identity=j + i * width, noise=self.noise)
-                self.allpts[i * height + j] = pt
-                if i > 0:
-                    pt.add_constraint(self.pts[width * (i - 1) + j])
-                if j > 0:
-                    pt.add_constraint(self.pts[-1])
-                if pin_cond(j, i, height, width):
-                    pt.pinned = True
-                if shape_fn(pt.x, pt.y):
-                    self.shapepts.append(pt)
-                    pt.shape = 1
-                else:
-                    self.normalpts.append(pt)
-                self.pts.append(pt)
-                b = self.blob_fn(pt.x, pt.y)
-                if b != -1 and b != False:
-                    self.blobs[b].append(pt)
-                    if pt in self.shapepts:
-                        self.shapepts.remove(pt)
-                    if pt in self.normalpts:
-                        self.normalpts.remove(pt)
-                    self.blobpts.append(pt)
-        self.pts = set(self.pts)
+        self.build_points()
 
     @property
     def centroids(self):
@@ -200,14 +170,11 @@ class ShapeCloth(Cloth):
 
 
     def setup(self, plot=False):
+        """
+        Computes the shape, outside and inside areas of the initial cloth from the shape mask.
+        """
         width, height = self.initial_params[0]
-        dx, dy = self.initial_params[1]
-        shape_fn = self.initial_params[2]
-        grid = np.zeros((height, width))
-        for i in range(height):
-            for j in range(width):
-                if shape_fn(j * dy + 50, i * dx + 50):
-                    grid[i, j] = 1
+        grid = self.mask.shape.astype(float)
         grid = signal.convolve2d(grid, np.ones((2, 2)), mode='same')
         grid = stats.threshold(grid, threshmax=1e-10, newval=1)
         if plot:
@@ -215,23 +182,11 @@ class ShapeCloth(Cloth):
             plt.show()
         self.shape_area = np.sum(grid)
         grid = -grid + 1
+        # Outside region is the 4-connected component of free cells containing (0, 0).
+        labels, _ = ndimage.label(grid)
         grid2 = np.zeros_like(grid)
-        queue = deque([])
-        seen = []
-        queue.append((0,0))
-        while len(queue) > 0:
-            pos = queue.popleft()
-            if pos in seen:
-                continue
-            seen.append(pos)
-            if grid[pos]:
-                grid2[pos] = 1
-                neighbors = [(pos[0] + 1, pos[1]), (pos[0] - 1, pos[1]), (pos[0], pos[1] - 1), (pos[0], pos[1] + 1)]
-                for pos in neighbors:
-                    if pos in seen or min(pos) < 0 or pos[0] >= height or pos[1] >= width:
-                        pass
-                    else:
-                        queue.append(pos)
+        if labels[0, 0]:
+            grid2[labels == labels[0, 0]] = 1
         if plot:
             plt.imshow(np.flipud(grid2), cmap='Greys_r')
             plt.show()
@@ -342,8 +297,6 @@ class ShapeCloth(Cloth):
 
     def centroid(self, plot=False):
         width, height = self.initial_params[0]
-        dx, dy = self.initial_params[1]
-        shape_fn = self.initial_params[2]
         grid = np.zeros((height, width))
         for key in self.allpts.keys():
             pt = self.allpts[key]
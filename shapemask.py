@@ -0,0 +1,133 @@
+import numpy as np
+from matplotlib.path import Path
+
+
+"""
+Boolean grids describing which points of a ShapeCloth lie on the shape outline
+and inside each blob. Evaluating a shape function at every grid point is slow
+when it is built from calibration data, so we rasterize it once and let the
+cloth reuse the grids in its constructor, reset(), setup() and centroid().
+"""
+class ShapeMask(object):
+
+    def __init__(self, shape, width=50, height=50, dx=10, dy=10, blobs=None,
+                 numblobs=None, offset=50, thickness=None):
+        """
+        Rasterizes SHAPE and BLOBS over a width x height grid of points located
+        at (offset + dx*j, offset + dy*i), the same layout ShapeCloth uses.
+
+        SHAPE is either a function shape_fn(x, y) that returns whether a point
+        is on the outline of the shape, or an (N, 2) array of polygon vertices.
+        For polygons, points within THICKNESS of an edge are on the outline;
+        this defaults to half the grid spacing.
+
+        BLOBS is either a function blob_fn(x, y) that returns the index of the
+        blob containing a point (-1, None or False for none; 0 is a blob), or a
+        list of polygons, one per blob. NUMBLOBS defaults to the number of
+        polygons, or for a function to one more than the largest index found.
+
+        Functions are first called once with arrays of all x and y coordinates;
+        if that fails or does not return one value per point, they are called
+        separately for every grid point instead.
+        """
+        self.width, self.height = width, height
+        self.dx, self.dy = dx, dy
+        self.offset = offset
+        if thickness is None:
+            thickness = 0.5 * max(dx, dy)
+        self.thickness = thickness
+        self.xs, self.ys = np.meshgrid(offset + dx * np.arange(width, dtype=float),
+                                       offset + dy * np.arange(height, dtype=float))
+        self.shape = self.rasterize_shape(shape)
+        self.blobs = self.rasterize_blobs(blobs)
+        if numblobs is None:
+            if blobs is None or callable(blobs):
+                numblobs = int(self.blobs.max()) + 1
+            else:
+                numblobs = len(blobs)
+        self.numblobs = numblobs
+
+    def rasterize_shape(self, shape):
+        """
+        Returns a (height, width) boolean grid that is True on the outline.
+        """
+        if callable(shape):
+            return self.evaluate(shape).astype(bool)
+        return polygon_outline(np.asarray(shape, dtype=float), self.xs, self.ys, self.thickness)
+
+    def rasterize_blobs(self, blobs):
+        """
+        Returns a (height, width) integer grid holding the blob index of each
+        point, or -1 for points outside every blob.
+        """
+        grid = np.full((self.height, self.width), -1, dtype=int)
+        if blobs is None:
+            return grid
+        if callable(blobs):
+            values = self.evaluate(blobs, blob_index)
+            if values.dtype == bool:
+                values = np.where(values, 1, -1)
+            elif values.dtype == object:
+                values = np.vectorize(blob_index, otypes=[int])(values)
+            inblob = values != -1
+            grid[inblob] = values[inblob]
+            return grid
+        pts = np.column_stack((self.xs.ravel(), self.ys.ravel()))
+        for b, polygon in enumerate(blobs):
+            inside = Path(np.asarray(polygon, dtype=float)).contains_points(pts)
+            inside = inside.reshape(self.xs.shape) & (grid == -1)
+            grid[inside] = b
+        return grid
+
+    def evaluate(self, fn, convert=None):
+        """
+        Evaluates fn(x, y) over the whole grid, vectorized if fn allows it.
+        When fn is called per point, CONVERT is applied to each value before
+        the values are collected into an array.
+        """
+        try:
+            values = np.asarray(fn(self.xs, self.ys))
+            if values.shape == self.xs.shape:
+                return values
+        except Exception:
+            pass
+        values = [fn(x, y) for x, y in zip(self.xs.ravel(), self.ys.ravel())]
+        if convert is not None:
+            values = [convert(v) for v in values]
+        return np.array(values).reshape(self.xs.shape)
+
+    @property
+    def area(self):
+        return int(np.sum(self.shape))
+
+
+def blob_index(b):
+    """
+    Converts a value returned by a blob function to a blob index, with -1 for
+    points outside every blob. Only None, False and -1 mean "no blob", so
+    index 0 is a valid blob even though 0 == False.
+    """
+    if b is None or isinstance(b, (bool, np.bool_)) and not b or b == -1:
+        return -1
+    return int(b)
+
+
+def polygon_outline(vertices, xs, ys, thickness):
+    """
+    Marks the grid points (xs, ys) that lie within THICKNESS of the closed
+    polygon with the given VERTICES.
+    """
+    starts = vertices
+    ends = np.roll(vertices, -1, axis=0)
+    pts = np.column_stack((xs.ravel(), ys.ravel()))
+    best = np.full(len(pts), np.inf)
+    for a, b in zip(starts, ends):
+        ab = b - a
+        length = np.dot(ab, ab)
+        if length == 0:
+            t = np.zeros(len(pts))
+        else:
+            t = np.clip(np.dot(pts - a, ab) / length, 0, 1)
+        closest = a + t[:, None] * ab
+        best = np.minimum(best, np.linalg.norm(pts - closest, axis=1))
+    return (best <= thickness).reshape(xs.shape)
@@ -1,9 +1,10 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import pickle, copy, sys
+import pickle, copy, sys, os
 import json
 from cloth import *
 from circlecloth import *
+from shapecloth import *
 from tensioner import *
 from mouse import *
 import IPython
@@ -68,12 +69,16 @@ class Simulation(object):
         ax2.cla()
         pts  = np.array([[p.x, p.y, p.z] for p in self.cloth.normalpts])
         cpts = np.array([[p.x, p.y, p.z] for p in self.cloth.shapepts])
+        bpts = np.array([[p.x, p.y, p.z] for p in getattr(self.cloth, 'blobpts', [])])
         if len(pts) > 0:
             ax1.scatter(pts[:,0], pts[:,1], c='g')
             ax2.scatter(pts[:,0], pts[:,1], pts[:,2], c='g')
         if len(cpts) > 0:
             ax1.scatter(cpts[:,0], cpts[:,1], c='b')
             ax2.scatter(cpts[:,0], cpts[:,1], cpts[:,2], c='b')
+        if len(bpts) > 0:
+            ax1.scatter(bpts[:,0], bpts[:,1], c='r')
+            ax2.scatter(bpts[:,0], bpts[:,1], bpts[:,2], c='r')
         ax2.set_zlim([0, 300]) # only for visualization purposes
         plt.show()
 
@@ -148,9 +153,46 @@ class Simulation(object):
     #     """
     #     return copy.deepcopy(self)
 
-def load_simulation_from_config(fname="config_files/default.json", shape_fn=None, trajectory=None, multipart=False, gravity=None, elasticity=False, noise=0):
+# Shape masks built from calibration data, keyed by the paths and modification
+# times of the config file and the calibration files it points to.
+_shape_masks = {}
+
+def require_calibration_loaders(*names):
+    """
+    The calibration point loaders and shape function builders used for config files are not part of this repository. Raises a clear error instead of a NameError when one of NAMES is missing.
+    """
+    missing = [name for name in names if name not in globals()]
+    if missing:
+        raise NotImplementedError("{} not defined; pass shape_fn (a function or polygon vertices) to load_simulation_from_config instead".format(", ".join(missing)))
+
+def load_shape_mask_from_config(fname="config_files/default.json", data=None):
+    """
+    Rasterizes the shape and blobs described by the configuration file FNAME into a ShapeMask. The result is cached per config file, so only the first call pays for evaluating the shape function built from the calibration points. DATA is the already parsed config, if available.
+    """
+    if data is None:
+        with open(fname) as data_file:
+            data = json.load(data_file)
+    cloth = data["shapecloth"]
+    require_calibration_loaders("load_robot_points", "get_shape_fn")
+    files = [fname] + list(cloth["shape_fn"])
+    if "blobs" in data["options"].keys():
+        require_calibration_loaders("load_points", "get_blob_fn")
+        files.append(data["options"]["blobs"][1])
+    key = tuple((os.path.abspath(f), os.path.getmtime(f)) for f in files)
+    if key not in _shape_masks:
+        corners = load_robot_points(cloth["shape_fn"][0])
+        pts = load_robot_points(cloth["shape_fn"][1])
+        shape_fn = get_shape_fn(corners, pts, True)
+        blob_fn, numblobs = None, 0
+        if "blobs" in data["options"].keys():
+            blobs = load_points(data["options"]["blobs"][1])
+            blob_fn, numblobs = get_blob_fn(corners, blobs), len(blobs)
+        _shape_masks[key] = ShapeMask(shape_fn, cloth["width"], cloth["height"], cloth["dx"], cloth["dy"], blob_fn, numblobs)
+    return _shape_masks[key]
+
+def load_simulation_from_config(fname="config_files/default.json", shape_fn=None, trajectory=None, multipart=False, gravity=None, elasticity=False, noise=0, **cloth_kwargs):
     """
-    Creates a Simulation object from a configuration file FNAME, and can optionally take in a SHAPE_FN or create one from discrete points saved to file. MULTIPART indicates whether or not the input trajectory consists of multiple subtrajectories.
+    Creates a Simulation object from a configuration file FNAME, and can optionally take in a SHAPE_FN (a function or polygon vertices) or create one from discrete points saved to file. MULTIPART indicates whether or not the input trajectory consists of multiple subtrajectories. Shape masks created from file are cached, see load_shape_mask_from_config. CLOTH_KWARGS are passed on to ShapeCloth, e.g. the constraint solver arguments.
     """
     with open(fname) as data_file:    
         data = json.load(data_file)
@@ -159,21 +201,21 @@ def load_simulation_from_config(fname="config_files/default.json", shape_fn=None
     bounds = (bounds["x"], bounds["y"], bounds["z"])
     mouse = Mouse(mouse["x"], mouse["y"], mouse["z"], mouse["height_limit"], mouse["down"], mouse["button"], bounds, mouse["influence"], mouse["cut"])
     cloth = data["shapecloth"]
-    corners, blobs = None, None
-    if "blobs" in data["options"].keys():
+    corners, blobs, mask = None, None, None
+    if shape_fn is not None and "blobs" in data["options"].keys():
+        require_calibration_loaders("load_robot_points", "load_points", "get_blob_fn")
         corners = load_robot_points(data["options"]["blobs"][0])
         blobs = load_points(data["options"]["blobs"][1])
-    if not shape_fn:
-        corners = load_robot_points(cloth["shape_fn"][0])
-        pts = load_robot_points(cloth["shape_fn"][1])
-        shape_fn = get_shape_fn(corners, pts, True)
+    if shape_fn is None:
+        mask = load_shape_mask_from_config(fname, data)
         if not trajectory:
+            require_calibration_loaders("load_trajectory_from_config")
             trajectory = load_trajectory_from_config(fname)
     if gravity == None:
         gravity = cloth["gravity"]
     if not elasticity:
         elasticity = cloth["elasticity"]
     cloth = ShapeCloth(shape_fn, mouse, cloth["width"], cloth["height"], cloth["dx"], cloth["dy"], 
-        gravity, elasticity, cloth["pin_cond"], bounds, blobs, corners, noise=noise)
+        gravity, elasticity, cloth["pin_cond"], bounds, blobs, corners, noise=noise, mask=mask, **cloth_kwargs)
     simulation = data["simulation"]
     return Simulation(cloth, simulation["init"], simulation["render"], simulation["update_iterations"], trajectory, multipart)
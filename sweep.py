@@ -0,0 +1,345 @@
+"""
+Runs a parameter sweep over cloth simulations described by a sweep config file.
+
+Usage: python sweep.py config_files/sweep.json [--workers 4] [--dry_run]
+
+The sweep config has these sections (see config_files/sweep.json):
+
+- "cloth": constructor arguments of the cloth. "type" is "CircleCloth"
+  (default) or "ShapeCloth". A ShapeCloth takes its "shape" as a list of
+  polygon vertices and optionally "blobs" as a list of polygons. With a
+  "config" path, the ShapeCloth is built by load_simulation_from_config
+  instead; "shape" is then passed as its shape_fn and the remaining
+  arguments (gravity, elasticity, noise, solver arguments) as overrides.
+- "points": attributes set on every point after construction, e.g. friction.
+- "simulation": "init" settling steps, "update_iterations" per step, "steps".
+  Each case is wrapped in a Simulation; for a "config" cloth these override
+  the config file's values when given. Rendering is always off.
+- "tension": optional pull schedule, pinning the cloth at ("x", "y") and every
+  "every" steps tugging by (dx, dy, dz) until the step given in "schedule".
+- "sweep": "mode" is "grid" or "random". "params" maps "cloth.<name>",
+  "points.<name>" or "simulation.<name>" to a list of values, or for random
+  search also to {"low": a, "high": b, "log": false, "int": false}, where
+  "int" rounds the sample for integer parameters. Random search draws
+  "num_samples" cases using "seed".
+- "output": "dir" to write results to and whether to save "snapshots".
+
+Each case writes its metrics to <dir>/cases/<case_id>.json, and cases whose
+file already exists are skipped, so an interrupted sweep can be resumed. A case
+that raises is recorded with its error but not stored, so a rerun retries it.
+The status, metrics and timings of all cases are collected in <dir>/summary.csv.
+"""
+import numpy as np
+import argparse, copy, csv, hashlib, itertools, json, os, time, traceback
+from multiprocessing import Pool
+from simulation import *
+
+
+SECTIONS = ("cloth", "points", "simulation")
+
+
+def load_sweep(fname):
+    """
+    Reads a sweep config file and expands it into a list of cases. Each case
+    is a dict mapping section to parameters, for example
+    {"cloth": {...}, "points": {...}, "simulation": {...}}.
+    """
+    with open(fname) as data_file:
+        config = json.load(data_file)
+    sweep = config.get("sweep", {})
+    mode = sweep.get("mode", "grid")
+    space = sweep.get("params", {})
+    for key in space.keys():
+        section = key.split(".", 1)[0]
+        if section not in SECTIONS or "." not in key:
+            raise ValueError("Unknown sweep parameter {}".format(key))
+
+    if mode == "grid":
+        keys = sorted(space.keys())
+        for key in keys:
+            if not isinstance(space[key], list):
+                raise ValueError("Grid parameter {} must be a list".format(key))
+        samples = [dict(zip(keys, values)) for values in
+                   itertools.product(*[space[key] for key in keys])]
+    elif mode == "random":
+        rng = np.random.RandomState(sweep.get("seed", 0))
+        samples = [sample_params(space, rng) for _ in range(sweep["num_samples"])]
+    else:
+        raise ValueError(mode)
+
+    # Random search can draw the same case twice, only run it once.
+    cases, seen = [], set()
+    for sample in samples:
+        case = dict((section, copy.deepcopy(config.get(section, {}))) for section in SECTIONS)
+        for key, value in sample.items():
+            section, name = key.split(".", 1)
+            case[section][name] = value
+        case["tension"] = config.get("tension")
+        case["swept"] = sample
+        if case_id(case) not in seen:
+            seen.add(case_id(case))
+            cases.append(case)
+    return config, cases
+
+
+def sample_params(space, rng):
+    """
+    Draws one random sample from the parameter SPACE. Lists are sampled
+    uniformly, {"low", "high"} ranges uniformly or log-uniformly if "log", and
+    rounded to the nearest integer if "int".
+    """
+    sample = {}
+    for key in sorted(space.keys()):
+        spec = space[key]
+        if isinstance(spec, list):
+            sample[key] = spec[rng.randint(len(spec))]
+            continue
+        if spec.get("log", False):
+            value = float(np.exp(rng.uniform(np.log(spec["low"]), np.log(spec["high"]))))
+        else:
+            value = float(rng.uniform(spec["low"], spec["high"]))
+        if spec.get("int", False):
+            value = int(round(value))
+        sample[key] = value
+    return sample
+
+
+def case_id(case):
+    """
+    A stable identifier for a case, used to name its result files.
+    """
+    key = json.dumps(dict((k, case[k]) for k in SECTIONS + ("tension",)), sort_keys=True)
+    return hashlib.md5(key.encode("utf-8")).hexdigest()[:12]
+
+
+def build_cloth(params):
+    """
+    Constructs the cloth described by the "cloth" parameters of a case.
+    """
+    params = dict(params)
+    kind = params.pop("type", "CircleCloth")
+    if kind not in ("CircleCloth", "ShapeCloth"):
+        raise ValueError(kind)
+    bounds = tuple(params.pop("bounds", (600, 600, 800)))
+    mouse = Mouse(bounds=bounds)
+    if kind == "ShapeCloth":
+        shape = params.pop("shape")
+        mask = ShapeMask(shape, params.get("width", 50), params.get("height", 50),
+                         params.get("dx", 10), params.get("dy", 10), params.pop("blobs", None))
+        return ShapeCloth(shape, mouse, bounds=bounds, mask=mask, **params)
+    return CircleCloth(mouse, bounds=bounds, **params)
+
+
+def build_simulation(case):
+    """
+    Constructs the Simulation of a case, either around the cloth described by
+    its "cloth" parameters or from the config file they point to.
+    """
+    params = dict(case["cloth"])
+    sim = case["simulation"]
+    if "config" in params:
+        if params.pop("type", "ShapeCloth") != "ShapeCloth":
+            raise ValueError("Only ShapeCloth can be loaded from a config file")
+        fname = params.pop("config")
+        simulation = load_simulation_from_config(fname, shape_fn=params.pop("shape", None), **params)
+        simulation.init = sim.get("init", simulation.init)
+        simulation.update_iterations = sim.get("update_iterations", simulation.update_iterations)
+    else:
+        simulation = Simulation(build_cloth(params), sim.get("init", 0), False, sim.get("update_iterations", 1))
+    simulation.render = False
+    # Nothing drives the mouse during a sweep, so it must not cut the cloth.
+    simulation.mouse.down = False
+    return simulation
+
+
+def run_case(args):
+    """
+    Runs a single case and writes its metrics (and optionally an end-state
+    snapshot) to OUTDIR. Returns the metrics, or the stored ones if the case
+    already has results on disk. If the case raises, returns a result with
+    status "error" and the traceback instead, without storing it.
+    """
+    case, outdir, snapshots = args
+    cid = case_id(case)
+    result_file = os.path.join(outdir, "cases", cid + ".json")
+    if os.path.exists(result_file):
+        with open(result_file) as f:
+            return json.load(f)
+    try:
+        result = simulate_case(case, cid, outdir, snapshots)
+    except Exception:
+        return {"case_id": cid, "params": case["swept"], "status": "error",
+                "error": traceback.format_exc(), "metrics": {}, "timings": {}}
+    tmp = result_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    os.rename(tmp, result_file)
+    return result
+
+
+def simulate_case(case, cid, outdir, snapshots):
+    """
+    Builds and simulates the cloth of a case, returning its result.
+    """
+    start_t = time.time()
+    simulation = build_simulation(case)
+    cloth = simulation.cloth
+    for pt in cloth.pts:
+        for name, value in case["points"].items():
+            setattr(pt, name, value)
+    build_time = time.time() - start_t
+
+    # Step the cloth directly: Simulation.update() calls cloth.update(), which
+    # no cloth class defines, and Simulation.reset() rebuilds the points,
+    # dropping the "points" parameters set above.
+    steps = case["simulation"].get("steps", 100)
+    start_t = time.time()
+    for _ in range(simulation.init):
+        cloth.simulate()
+    init_time = time.time() - start_t
+
+    tension = case["tension"]
+    tensioner = None
+    if tension:
+        tensioner = cloth.pin_position(tension["x"], tension["y"])
+    start_t = time.time()
+    for i in range(steps):
+        if tensioner is not None:
+            pull(i, tensioner, tension)
+        for _ in range(simulation.update_iterations):
+            cloth.simulate()
+    run_time = time.time() - start_t
+
+    result = {"case_id": cid, "params": case["swept"], "status": "ok"}
+    result["metrics"] = cloth_metrics(cloth)
+    result["timings"] = {
+        "build": build_time,
+        "init": init_time,
+        "run": run_time,
+        "per_update": run_time / max(1, steps * simulation.update_iterations),
+    }
+    if snapshots:
+        np.savez(os.path.join(outdir, "snapshots", cid + ".npz"),
+                 pts=np.array([[p.x, p.y, p.z] for p in cloth.pts]),
+                 shape=np.array([p in cloth.shapepts for p in cloth.pts]))
+    return result
+
+
+def pull(i, tensioner, tension):
+    """
+    Applies the pull schedule at step I, like pull() in demo.py. Once the last
+    entry of the schedule has passed the tensioner lets go.
+    """
+    if i % tension.get("every", 10) != 0:
+        return
+    for until, dx, dy, dz in tension["schedule"]:
+        if i < until:
+            tensioner.tension(x=dx, y=dy, z=dz)
+            return
+    if tensioner in tensioner.cloth.tensioners:
+        tensioner.unpin_position()
+
+
+def cloth_metrics(cloth):
+    """
+    Summary statistics of the end state of a cloth.
+    """
+    z = np.array([p.z for p in cloth.pts])
+    shape_z = np.array([p.z for p in cloth.shapepts]) if len(cloth.shapepts) else z
+    stretch = [abs(np.sqrt((c.p1.x - c.p2.x) ** 2 + (c.p1.y - c.p2.y) ** 2 + (c.p1.z - c.p2.z) ** 2) / c.length - 1)
+               for p in cloth.pts for c in p.constraints]
+    metrics = {
+        "num_pts": len(cloth.pts),
+        "mean_z": float(np.mean(z)),
+        "min_z": float(np.min(z)),
+        "max_z": float(np.max(z)),
+        "shape_mean_z": float(np.mean(shape_z)),
+        "shape_median_z": float(np.median(shape_z)),
+        "max_stretch": float(np.max(stretch)) if stretch else 0.0,
+        "rms_stretch": float(np.sqrt(np.mean(np.square(stretch)))) if stretch else 0.0,
+    }
+    if len(cloth.residual_history):
+        metrics["mean_sweeps"] = float(np.mean([len(r) for r in cloth.residual_history]))
+        metrics["max_sweeps"] = max(len(r) for r in cloth.residual_history)
+    return metrics
+
+
+def write_summary(results, fname):
+    """
+    Writes one row per case with its status, swept parameters, metrics and
+    timings. Failed cases keep only the last line of their error.
+    """
+    params = sorted(set(k for r in results for k in r["params"]))
+    metrics = sorted(set(k for r in results for k in r["metrics"]))
+    timings = sorted(set(k for r in results for k in r["timings"]))
+    with open(fname, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(["case_id", "status", "error"] + params + metrics + ["time_" + k for k in timings])
+        for r in sorted(results, key=lambda r: r["case_id"]):
+            error = r.get("error", "").strip().split("\n")[-1]
+            writer.writerow([r["case_id"], r.get("status", "ok"), error] +
+                            [r["params"].get(k, "") for k in params] +
+                            [r["metrics"].get(k, "") for k in metrics] +
+                            [r["timings"].get(k, "") for k in timings])
+
+
+def run_sweep(fname, workers=None, dry_run=False):
+    """
+    Runs every case of the sweep config FNAME across a pool of WORKERS
+    processes and returns the results.
+    """
+    config, cases = load_sweep(fname)
+    output = config.get("output", {})
+    outdir = output.get("dir", os.path.join("sweeps", os.path.splitext(os.path.basename(fname))[0]))
+    snapshots = output.get("snapshots", False)
+    if workers is None:
+        workers = config.get("workers", 1)
+    done = [os.path.exists(os.path.join(outdir, "cases", case_id(c) + ".json")) for c in cases]
+    print("{} cases, {} already done, writing to {}".format(len(cases), sum(done), outdir))
+    if dry_run:
+        for case, d in zip(cases, done):
+            print("  {} {} {}".format(case_id(case), "done" if d else "todo", json.dumps(case["swept"], sort_keys=True)))
+        return []
+    for sub in ("cases", "snapshots"):
+        if not os.path.exists(os.path.join(outdir, sub)):
+            os.makedirs(os.path.join(outdir, sub))
+
+    start_t = time.time()
+    jobs = [(case, outdir, snapshots) for case in cases]
+    results = []
+
+    def record(result):
+        results.append(result)
+        if result.get("status", "ok") != "ok":
+            print("case {} failed:\n{}".format(result["case_id"], result["error"]))
+        print("{}/{} done, minutes: {:.1f}".format(len(results), len(jobs), (time.time() - start_t) / 60.0))
+
+    # Write whatever finished even if the sweep itself is interrupted.
+    try:
+        if workers > 1:
+            pool = Pool(workers)
+            try:
+                for result in pool.imap_unordered(run_case, jobs):
+                    record(result)
+            finally:
+                # Every result has been received here unless we were interrupted.
+                pool.terminate()
+                pool.join()
+        else:
+            for job in jobs:
+                record(run_case(job))
+    finally:
+        write_summary(results, os.path.join(outdir, "summary.csv"))
+    failed = sum(1 for r in results if r.get("status", "ok") != "ok")
+    if failed:
+        print("{} of {} cases failed, see summary.csv".format(failed, len(results)))
+    return results
+
+
+if __name__ == "__main__":
+    pp = argparse.ArgumentParser()
+    pp.add_argument('config', type=str)
+    pp.add_argument('--workers', type=int, default=None)
+    pp.add_argument('--dry_run', action='store_true', default=False)
+    args = pp.parse_args()
+    run_sweep(args.config, args.workers, args.dry_run)